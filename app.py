@@ -1,25 +1,43 @@
 from __future__ import annotations
 
-import json
 import os
 import re
 import uuid
 import subprocess
 import threading
+import time
 import zipfile
 import shutil
+import atexit
+import bisect
+import hashlib
+import heapq
+import mmap
+import struct
+import wave
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Dict, Iterator, Optional, List, Tuple
+from urllib.parse import quote
+from collections import Counter, defaultdict
 from concurrent.futures import ThreadPoolExecutor, Future
 
+import orjson
 from fastapi import FastAPI, File, Form, UploadFile, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
-from faster_whisper import WhisperModel
+import av
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.vad import get_speech_timestamps
 
 # =========================
 # Paths / App
@@ -30,14 +48,26 @@ UPLOAD_DIR = BASE_DIR / "uploads"
 CACHE_DIR = BASE_DIR / "clips_cache"
 
 EXPORT_DIR = BASE_DIR / "exports"
-IMPORT_DIR = BASE_DIR / "imports_tmp"
+MODELS_DIR = BASE_DIR / "models"
 
 UPLOAD_DIR.mkdir(exist_ok=True)
 CACHE_DIR.mkdir(exist_ok=True)
 EXPORT_DIR.mkdir(exist_ok=True)
-IMPORT_DIR.mkdir(exist_ok=True)
 
-app = FastAPI(title="Voice Search App")
+UPLOAD_CHUNK_SIZE = 1 << 20  # 업로드 파일을 디스크로 옮길 때 한 번에 읽는 크기
+CLIP_STREAM_CHUNK = 64 << 10  # ffmpeg 파이프에서 한 번에 읽어 보내는 크기
+# 이보다 짧은 클립은 스트리밍하지 않고 파일로 잘라서 보냄 (api_clip_audio)
+CLIP_STREAM_MIN_SECONDS = float(os.environ.get("CLIP_STREAM_MIN_SECONDS", "30"))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # 시작할 때 클립 캐시 정리를 백그라운드로 한 번 (요청 처리는 바로 시작)
+    threading.Thread(target=sweep_clip_cache, name="clip-cache-sweep", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Voice Search App", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
@@ -46,48 +76,193 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 # =========================
 WHISPER_MODEL_NAME = os.environ.get("WHISPER_MODEL", "small")
 WHISPER_DEVICE = os.environ.get("WHISPER_DEVICE", "cpu")   # "cuda" 가능
-WHISPER_COMPUTE = os.environ.get("WHISPER_COMPUTE", "int8")  # cpu면 int8 권장
+# 지정 안 하면 장치별 기본값: cuda면 "auto"(CTranslate2가 GPU에 맞춰 float16/bfloat16/int8_float16 선택), cpu면 int8
+# "int4"면 양자화된 가중치를 models/ 에 미리 변환해두고 그걸 로드 (convert_model_int4 참고)
+WHISPER_COMPUTE = (
+    os.environ.get("WHISPER_COMPUTE")
+    or os.environ.get("ASR_QUANTIZATION")
+    or ("auto" if WHISPER_DEVICE == "cuda" else "int8")
+)
+
+# 1보다 크면 VAD로 잘라낸 구간들을 묶어서 한 번에 디코딩 (BatchedInferencePipeline)
+# GPU에서 효과가 크지만, 문장 단위 구간이 순차 경로와 똑같이 나오는지 확인 전이라 기본은 끔(1)
+WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "1"))
+
+
+def _default_workers() -> int:
+    c = os.cpu_count() or 4
+    # CPU면 너무 과하면 오히려 느려져서 1~4 정도가 안정적
+    return max(1, min(4, c))
+
+
+# 동시에 돌 수 있는 STT 작업 수 = 모델 하나를 같이 쓰는 transcribe 동시 호출 수
+# 모델은 프로세스당 하나만 올림(get_whisper_model). 실제로 동시에 디코딩하는 수는 MODEL_WORKERS 참고
+STT_WORKERS = int(os.environ.get("STT_WORKERS", _default_workers()))
+
+# STT_CHUNK_WORKERS를 2 이상으로 주면, 배치 파이프라인을 안 쓸 때 긴 파일은 VAD로 말소리 구간을
+# STT_CHUNK_SECONDS 정도씩 묶어서 여러 구간을 동시에 디코딩함
+# 구간 경계에서 앞 문장 문맥이 끊기니까 결과가 순차 경로와 같은지 확인 전까지는 기본 끔(1)
+# EXECUTOR 안에서 EXECUTOR에 다시 넣으면 서로 기다리다 멈출 수 있어서 전용 풀을 따로 씀
+STT_CHUNK_WORKERS = max(1, int(os.environ.get("STT_CHUNK_WORKERS", "1")))
+STT_CHUNK_SECONDS = float(os.environ.get("STT_CHUNK_SECONDS", "30"))
+STT_PARALLEL_MIN_SECONDS = float(os.environ.get("STT_PARALLEL_MIN_SECONDS", "120"))
+STT_SAMPLE_RATE = 16000  # faster-whisper 입력 샘플레이트
+
+# CTranslate2 worker 수 (= 모델이 동시에 디코딩하는 수)
+# - GPU: transcribe를 동시에 부르는 스레드 수만큼 둬서 서로 기다리지 않게
+# - CPU: worker마다 cpu_threads개 스레드를 따로 띄우니까, 여러 개면 코어 수 × N으로 경합함
+#        → 기본은 worker 하나가 전체 코어를 쓰고, 동시에 들어온 작업은 모델 앞에서 차례로 (총 처리량은 같음)
+#        구간 병렬(STT_CHUNK_WORKERS > 1)을 켜면 그 수만큼 worker를 두고 코어를 나눠 씀
+if WHISPER_DEVICE == "cuda":
+    MODEL_WORKERS = max(STT_WORKERS, STT_CHUNK_WORKERS)
+else:
+    MODEL_WORKERS = STT_CHUNK_WORKERS
+
+# worker 하나가 쓰는 intra-op 스레드 수 (worker 수 × 이 값이 코어 수를 넘지 않게)
+WHISPER_CPU_THREADS = max(1, (os.cpu_count() or 4) // MODEL_WORKERS)
 
 _whisper_model: Optional[WhisperModel] = None
+_batched_pipeline: Optional[BatchedInferencePipeline] = None
+_MODEL_INIT_LOCK = threading.Lock()  # 첫 작업 여러 개가 동시에 들어와도 모델은 한 번만 로드
 
-DATA_LOCK = threading.Lock()
+DATA_LOCK = threading.RLock()  # load_data/save_data 안에서도 잡기 때문에 재진입 가능해야 함
+_DATA_SHA: Optional[bytes] = None  # 마지막으로 data.json에 쓴 내용의 sha256 (같으면 쓰기 생략)
 
-def save_data_atomic(data: Dict[str, Any]):
-    tmp = DATA_PATH.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(DATA_PATH)
+def dump_data(data: Dict[str, Any]) -> bytes:
+    # 들여쓰기 없이 저장해서 파일 크기/쓰기량을 줄임
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+
+def write_data_bytes(payload: bytes):
+    """
+    같은 폴더의 임시 파일에 쓰고 fsync → os.replace (중간에 죽어도 data.json은 이전 것 or 새 것 둘 중 하나)
+    """
+    global _DATA_SHA
+    digest = hashlib.sha256(payload).digest()
+    if digest == _DATA_SHA and DATA_PATH.exists():
+        return  # 직전에 쓴 것과 똑같으면 fsync까지 할 필요 없음
+    tmp = DATA_PATH.with_suffix(f".tmp.{os.getpid()}.{uuid.uuid4().hex}")
+    # Windows에서는 O_BINARY가 없으면 텍스트 모드로 열려서 \n이 \r\n으로 바뀜
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, DATA_PATH)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _DATA_SHA = digest
+
+    # rename 자체도 디스크에 남도록 폴더도 fsync (지원 안 하는 OS는 건너뜀)
+    if hasattr(os, "O_DIRECTORY"):
+        try:
+            dfd = os.open(DATA_PATH.parent, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(dfd)
+        except OSError:
+            pass
+        finally:
+            os.close(dfd)
+
+
+def convert_model_int4(model_name: str) -> Optional[Path]:
+    """
+    CTranslate2는 아직 Whisper에 4bit 가중치를 지원하지 않아서, 현재 가능한 가장 작은 int8 가중치로
+    models/ 아래에 한 번만 변환해 둠 (fp16 원본을 매번 로드하면서 양자화하는 것보다 로드/메모리가 가벼움)
+    변환 도구(ct2-transformers-converter + transformers)가 없거나 실패하면 None
+    """
+    out_dir = MODELS_DIR / f"{model_name.replace('/', '_')}-int8"
+    if (out_dir / "model.bin").exists():
+        return out_dir
+
+    hf_name = model_name if "/" in model_name else f"openai/whisper-{model_name}"
+    MODELS_DIR.mkdir(exist_ok=True)
+    try:
+        subprocess.check_call([
+            "ct2-transformers-converter",
+            "--model", hf_name,
+            "--output_dir", str(out_dir),
+            "--quantization", "int8",
+            "--copy_files", "tokenizer.json", "preprocessor_config.json",
+            "--force",
+        ])
+    except Exception:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        return None
+    return out_dir
 
 
 def get_whisper_model() -> WhisperModel:
     global _whisper_model
-    if _whisper_model is None:
+    if _whisper_model is not None:
+        return _whisper_model
+    with _MODEL_INIT_LOCK:
+        if _whisper_model is not None:
+            return _whisper_model
+        model_path = WHISPER_MODEL_NAME
+        compute_type = WHISPER_COMPUTE
+        if compute_type == "int4":
+            converted = convert_model_int4(WHISPER_MODEL_NAME)
+            if converted:
+                model_path = str(converted)
+            compute_type = "int8"
+
         _whisper_model = WhisperModel(
-            WHISPER_MODEL_NAME,
+            model_path,
             device=WHISPER_DEVICE,
-            compute_type=WHISPER_COMPUTE,
+            compute_type=compute_type,
+            cpu_threads=WHISPER_CPU_THREADS,
+            num_workers=MODEL_WORKERS,
         )
     return _whisper_model
 
 
+def get_batched_pipeline() -> BatchedInferencePipeline:
+    global _batched_pipeline
+    if _batched_pipeline is not None:
+        return _batched_pipeline
+    model = get_whisper_model()
+    with _MODEL_INIT_LOCK:
+        if _batched_pipeline is None:
+            _batched_pipeline = BatchedInferencePipeline(model=model)
+    return _batched_pipeline
+
+
 # =========================
 # STT Executor (병렬 처리)
 # =========================
-def _default_workers() -> int:
-    c = os.cpu_count() or 4
-    # CPU면 너무 과하면 오히려 느려져서 1~4 정도가 안정적
-    return max(1, min(4, c))
-
-
-EXECUTOR = ThreadPoolExecutor(max_workers=int(os.environ.get("STT_WORKERS", _default_workers())))
+EXECUTOR = ThreadPoolExecutor(max_workers=STT_WORKERS)
+CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=STT_CHUNK_WORKERS)  # 긴 파일 구간 병렬 디코딩 전용
+PROGRESS_MIN_INTERVAL = 0.25  # 진행률(%)이 그대로면 이 간격(초)보다 자주 job 상태를 갱신하지 않음
 
 # =========================
 # In-memory Job store (취소/미래객체 포함)
 # =========================
-JOBS: Dict[str, Dict[str, Any]] = {}
-JOBS_LOCK = threading.Lock()
+JOBS: Dict[str, "GravelJob"] = {}
+JOBS_LOCK = threading.Lock()  # JOBS에 job을 새로 넣을 때만 잡음 (진행률 갱신은 job마다 따로 잠금)
 
 
 class GravelJob:
+    """
+    job 하나의 상태 + 전용 락
+    STT 작업 여러 개가 동시에 진행률을 올려도 서로 다른 락을 잡아서 안 막힘
+    """
+
+    __slots__ = ("lock", "state", "cancel_event", "future")
+
+    def __init__(self, job_id: str):
+        self.lock = threading.Lock()
+        self.state = GravelJob.default(job_id)
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
     @staticmethod
     def default(job_id: str) -> Dict[str, Any]:
         return {
@@ -100,65 +275,88 @@ class GravelJob:
         }
 
 
-def set_job(job_id: str, **kwargs):
+def _job_entry(job_id: str, create: bool = True) -> Optional[GravelJob]:
+    j = JOBS.get(job_id)  # 이미 있으면 전역 락 없이 바로
+    if j is not None or not create:
+        return j
     with JOBS_LOCK:
-        JOBS.setdefault(job_id, GravelJob.default(job_id)).update(kwargs)
+        return JOBS.setdefault(job_id, GravelJob(job_id))
+
+
+def set_job(job_id: str, **kwargs):
+    j = _job_entry(job_id)
+    with j.lock:
+        j.state.update(kwargs)
 
 
 def get_job(job_id: str) -> Optional[Dict[str, Any]]:
-    with JOBS_LOCK:
-        j = JOBS.get(job_id)
-        if not j:
-            return None
-        out = dict(j)
-        out.pop("_cancel_event", None)
-        out.pop("_future", None)
-        return out
+    j = _job_entry(job_id, create=False)
+    if j is None:
+        return None
+    with j.lock:
+        return dict(j.state)
 
 
 def _get_cancel_event(job_id: str) -> threading.Event:
-    with JOBS_LOCK:
-        j = JOBS.setdefault(job_id, GravelJob.default(job_id))
-        ev = j.get("_cancel_event")
-        if isinstance(ev, threading.Event):
-            return ev
-        ev = threading.Event()
-        j["_cancel_event"] = ev
-        return ev
+    return _job_entry(job_id).cancel_event
 
 
 def _set_future(job_id: str, fut: Future):
-    with JOBS_LOCK:
-        j = JOBS.setdefault(job_id, GravelJob.default(job_id))
-        j["_future"] = fut
+    _job_entry(job_id).future = fut
 
 
 def _get_future(job_id: str) -> Optional[Future]:
-    with JOBS_LOCK:
-        j = JOBS.get(job_id) or {}
-        fut = j.get("_future")
-        return fut if isinstance(fut, Future) else None
+    j = _job_entry(job_id, create=False)
+    return j.future if j is not None else None
 
 
 # =========================
-# Data utils (json DB) - 깨진 JSON 자동 복구
+# Data utils (json DB) - 메모리 캐시 + 지연 저장, 깨진 JSON 자동 복구
+# - load_data()는 파싱해둔 dict를 그대로 돌려줌 (data.json이 밖에서 바뀌었을 때만 다시 읽음)
+# - save_data()는 캐시만 갱신하고, 실제 파일 쓰기는 writer 스레드가 DATA_FLUSH_DELAY 동안 모았다가 한 번에 함
 # =========================
-def load_data() -> Dict[str, Any]:
+DATA_FLUSH_DELAY = float(os.environ.get("DATA_FLUSH_DELAY", "0.5"))
+
+# 마지막으로 읽거나 쓴 data.json의 (mtime_ns, 크기, inode)
+# mtime 해상도가 거친 파일시스템에서도, 같은 시각에 os.replace로 바뀐 파일도 놓치지 않게 셋 다 비교
+_DATA_STAMP: Optional[Tuple[int, int, int]] = None
+_DATA_DIRTY = False
+_FLUSH_WAKE = threading.Event()  # 저장할 게 생겼다고 writer 스레드를 깨움
+_WRITER: Optional[threading.Thread] = None
+_WRITE_LOCK = threading.Lock()  # data.json 파일 쓰기 순서만 지킴 (DATA_LOCK과 별개)
+_FLUSH_SEQ = 0     # 직렬화한 스냅샷 번호
+_WRITTEN_SEQ = 0   # 파일에 실제로 써진 스냅샷 번호
+_FLUSHING = 0      # 락 밖에서 쓰는 중인 flush 수
+
+
+def _empty_data() -> Dict[str, Any]:
+    return {"profiles": [], "audios": [], "clips": []}
+
+
+def _data_stamp() -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(DATA_PATH)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _read_data_file() -> Dict[str, Any]:
     if not DATA_PATH.exists():
-        return {"profiles": [], "audios": [], "clips": []}
+        return _empty_data()
 
     try:
-        txt = DATA_PATH.read_text(encoding="utf-8")
-        if not txt.strip():
-            return {"profiles": [], "audios": [], "clips": []}
-        data = json.loads(txt)
-    except Exception:
+        raw = DATA_PATH.read_bytes()
+        if not raw.strip():
+            return _empty_data()
+        data = orjson.loads(raw)
+    except (OSError, orjson.JSONDecodeError):
         try:
             bak = DATA_PATH.with_suffix(f".broken.{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
             DATA_PATH.replace(bak)
         except Exception:
             pass
-        return {"profiles": [], "audios": [], "clips": []}
+        return _empty_data()
 
     data.setdefault("profiles", [])
     data.setdefault("audios", [])
@@ -166,9 +364,257 @@ def load_data() -> Dict[str, Any]:
     return data
 
 
+class DataStore:
+    """
+    파싱해둔 data.json + id 색인 (profiles_by_id / audios_by_id / clips_by_id)
+    추가·삭제는 여기 메서드로만 해야 색인과 검색 색인이 같이 맞춰짐
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.version = 0  # 추가·삭제가 있을 때마다 +1 (data_transaction이 저장할지 판단)
+        self.reindex()
+
+    def reindex(self):
+        self.profiles_by_id = self._by_id(self.data["profiles"])
+        self.audios_by_id = self._by_id(self.data["audios"])
+        self.clips_by_id = self._by_id(self.data["clips"])
+        # (다운로드 파일 기본이름, clip_id) -> (같은 이름 중 순번, 같은 이름 개수). 클립이 바뀌면 다음 다운로드 때 다시 만듦
+        self._name_ranks: Optional[Dict[Tuple[str, str], Tuple[int, int]]] = None
+        # profile_id -> 그 프로필 클립들 (data["clips"] 순서 그대로). 클립이 바뀌면 다음에 필요할 때 다시 만듦
+        self._clips_by_profile: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    def snapshot(self):
+        # data_transaction 되돌리기용. 메서드들은 목록에 넣고 빼기만 하고 레코드 자체는 안 고치니까 목록만 얕게 복사
+        return {k: list(self.data[k]) for k in ("profiles", "audios", "clips")}, self.version
+
+    def restore(self, snap):
+        global _SEARCH_INDEX
+        lists, version = snap
+        with DATA_LOCK:
+            self.data.update(lists)
+            self.reindex()
+            self.version = version
+            _SEARCH_INDEX = None  # add/remove_clips가 검색 색인도 고쳤으니 다음 검색 때 다시 만듦
+
+    @staticmethod
+    def _by_id(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for it in items:
+            iid = it.get("id")
+            if iid and iid not in out:  # 중복 id면 앞에 있는 것 (기존 next(...)와 동일)
+                out[iid] = it
+        return out
+
+    def profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles_by_id.get(profile_id)
+
+    def audio(self, audio_id: str) -> Optional[Dict[str, Any]]:
+        return self.audios_by_id.get(audio_id)
+
+    def clip(self, clip_id: str) -> Optional[Dict[str, Any]]:
+        return self.clips_by_id.get(clip_id)
+
+    def profile_clips(self, profile_id: str) -> List[Dict[str, Any]]:
+        # 프로필 하나의 클립만 필요할 때 전체 클립을 훑지 않도록 (복사본을 돌려줌)
+        with DATA_LOCK:
+            if self._clips_by_profile is None:
+                groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+                for c in self.data["clips"]:
+                    groups[c.get("profile_id")].append(c)
+                self._clips_by_profile = groups
+            return list(self._clips_by_profile.get(profile_id, ()))
+
+    def _build_name_ranks(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        groups: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for c in self.data["clips"]:
+            groups[clip_safe_base(c)].append(((c.get("created_at") or ""), (c.get("id") or "")))
+        ranks: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for base, members in groups.items():
+            members.sort()
+            for i, (_, cid) in enumerate(members):
+                ranks.setdefault((base, cid), (i + 1, len(members)))  # 같은 id가 여러 번이면 앞 순번
+        return ranks
+
+    def download_name(self, clip: Dict[str, Any]) -> str:
+        """
+        같은 대사 클립이 여러 개면 "대사 (2).wav"처럼 번호를 붙임 (created_at, id 순)
+        다운로드마다 전체 클립의 파일명을 다시 만들지 않도록 한 번 만든 순번표를 재사용
+        """
+        safe_base = clip_safe_base(clip)
+        with DATA_LOCK:
+            if self._name_ranks is None:
+                self._name_ranks = self._build_name_ranks()
+            idx, count = self._name_ranks.get((safe_base, clip.get("id") or ""), (0, 0))
+        if count <= 1 or idx <= 1:
+            return f"{safe_base}.wav"
+        return f"{safe_base} ({idx}).wav"
+
+    def add_profile(self, prof: Dict[str, Any]):
+        with DATA_LOCK:
+            self.data["profiles"].append(prof)
+            self.profiles_by_id.setdefault(prof["id"], prof)
+            self.version += 1
+
+    def add_audios(self, audios: List[Dict[str, Any]]):
+        with DATA_LOCK:
+            self.data["audios"].extend(audios)
+            for a in audios:
+                self.audios_by_id.setdefault(a["id"], a)
+            self.version += 1
+
+    def add_clips(self, clips: List[Dict[str, Any]]):
+        with DATA_LOCK:
+            self.data["clips"].extend(clips)
+            for c in clips:
+                self.clips_by_id.setdefault(c["id"], c)
+            index_add_clips(clips)
+            self._name_ranks = None
+            self._clips_by_profile = None
+            self.version += 1
+
+    def remove_profile(self, profile_id: str):
+        with DATA_LOCK:
+            if self.profiles_by_id.pop(profile_id, None) is None:
+                return
+            self.data["profiles"] = [p for p in self.data["profiles"] if p.get("id") != profile_id]
+            self.version += 1
+
+    def remove_audios(self, audio_ids) -> List[Dict[str, Any]]:
+        with DATA_LOCK:
+            id_set = set(audio_ids)
+            removed = [a for a in self.data["audios"] if a.get("id") in id_set]
+            if removed:
+                self.data["audios"] = [a for a in self.data["audios"] if a.get("id") not in id_set]
+                for aid in id_set:
+                    self.audios_by_id.pop(aid, None)
+                self.version += 1
+            return removed
+
+    def remove_clips(self, clip_ids) -> List[Dict[str, Any]]:
+        with DATA_LOCK:
+            id_set = set(clip_ids)
+            removed = [c for c in self.data["clips"] if c.get("id") in id_set]
+            if removed:
+                self.data["clips"] = [c for c in self.data["clips"] if c.get("id") not in id_set]
+                for cid in id_set:
+                    self.clips_by_id.pop(cid, None)
+                index_remove_clips(id_set)
+                self._name_ranks = None
+                self._clips_by_profile = None
+                self.version += 1
+            return removed
+
+
+_STORE: Optional[DataStore] = None
+
+
+def get_store() -> DataStore:
+    global _STORE, _DATA_STAMP, _SEARCH_INDEX, _DATA_SHA
+    with DATA_LOCK:
+        # 아직 안 쓴 변경이 있으면 디스크보다 캐시가 최신
+        if _STORE is not None and (_DATA_DIRTY or _FLUSHING):
+            return _STORE
+        stamp = _data_stamp()
+        if _STORE is not None and stamp == _DATA_STAMP:
+            return _STORE
+        # stat을 읽기 전에 떠둬야 읽는 도중 바뀐 경우 다음 호출에서 다시 읽음
+        _STORE = DataStore(_read_data_file())
+        _DATA_STAMP = stamp
+        _SEARCH_INDEX = None  # 새로 읽은 데이터 기준으로 다음 검색 때 다시 만듦
+        _DATA_SHA = None  # 밖에서 바뀐 파일이라 마지막으로 쓴 내용과 비교할 수 없음
+        return _STORE
+
+
+def load_data() -> Dict[str, Any]:
+    return get_store().data
+
+
+@contextmanager
+def data_transaction() -> Iterator[DataStore]:
+    """
+    읽고-고치고-저장을 DATA_LOCK 하나로 묶음 (동시에 들어온 요청끼리 서로 덮어쓰지 않게)
+    블록 안에서 실제로 바뀐 게 있을 때만 저장 예약
+    블록이 예외로 끝나면 들어가기 전 상태로 되돌림 (반만 적용된 변경이 나중에 다른 저장에 묻혀 써지지 않게)
+    """
+    with DATA_LOCK:
+        store = get_store()
+        before = store.version
+        snap = store.snapshot()
+        try:
+            yield store
+        except BaseException:
+            if store.version != before:
+                store.restore(snap)
+            raise
+        if store.version != before:
+            save_data(store.data)
+
+
 def save_data(data: Dict[str, Any]):
-    # 기존처럼 바로 write_text 하지 말고 원자적으로 교체
-    save_data_atomic(data)
+    global _STORE, _DATA_DIRTY, _WRITER
+    with DATA_LOCK:
+        if _STORE is None or _STORE.data is not data:
+            _STORE = DataStore(data)
+        _DATA_DIRTY = True
+        if _WRITER is None:
+            _WRITER = threading.Thread(target=_writer_loop, name="data-writer", daemon=True)
+            _WRITER.start()
+    _FLUSH_WAKE.set()
+
+
+def _writer_loop():
+    """
+    data.json 쓰기 전담 스레드 (저장 요청마다 Timer 스레드를 새로 만들지 않음)
+    깨어나면 DATA_FLUSH_DELAY만큼 더 모았다가 한 번에 씀 → 동시에 끝난 STT 작업/연속 삭제도 fsync 한 번
+    """
+    while True:
+        _FLUSH_WAKE.wait()
+        time.sleep(DATA_FLUSH_DELAY)
+        _FLUSH_WAKE.clear()
+        try:
+            flush_data()
+        except Exception:
+            # 디스크 문제 등으로 실패하면 잠깐 쉬었다가 다시 시도 (변경은 dirty로 남아 있음)
+            time.sleep(1.0)
+            _FLUSH_WAKE.set()
+
+
+def flush_data():
+    """
+    DATA_LOCK은 직렬화(스냅샷 뜨기)하는 동안만 잡고, 파일 쓰기/fsync는 락 밖에서 함
+    → 디스크가 느려도 검색/다운로드/다른 쓰기 요청이 그동안 멈추지 않음
+    """
+    global _DATA_DIRTY, _DATA_STAMP, _FLUSH_SEQ, _FLUSHING, _WRITTEN_SEQ
+    with DATA_LOCK:
+        if not _DATA_DIRTY or _STORE is None:
+            return
+        payload = dump_data(_STORE.data)
+        _DATA_DIRTY = False
+        _FLUSH_SEQ += 1
+        seq = _FLUSH_SEQ
+        _FLUSHING += 1  # 쓰는 중엔 디스크 파일보다 캐시가 최신 (get_store가 다시 읽지 않게)
+
+    try:
+        with _WRITE_LOCK:
+            # 더 나중 스냅샷이 이미 써졌으면 예전 걸로 덮어쓰지 않음
+            if seq > _WRITTEN_SEQ:
+                # 기존처럼 바로 write_text 하지 말고 원자적으로 교체
+                write_data_bytes(payload)
+                _WRITTEN_SEQ = seq
+    except BaseException:
+        with DATA_LOCK:
+            _DATA_DIRTY = True  # 못 쓴 변경은 다음 flush 때 다시 씀
+            _FLUSHING -= 1
+        raise
+
+    with DATA_LOCK:
+        _FLUSHING -= 1
+        _DATA_STAMP = _data_stamp()
+
+
+# 종료 직전에 아직 안 쓴 변경 저장
+atexit.register(flush_data)
 
 
 def now_iso() -> str:
@@ -178,10 +624,13 @@ def now_iso() -> str:
 # =========================
 # Filename helper (다운로드 파일명 깔끔하게)
 # =========================
+_FILENAME_FORBID_TBL = str.maketrans("", "", '\\/:*?"<>|')
+
+
+@lru_cache(maxsize=8192)
 def make_safe_filename(base: str, fallback: str = "clip", max_len: int = 80) -> str:
-    s = (base or "").strip()
-    s = re.sub(r"\s+", " ", s)
-    s = re.sub(r'[\\/:*?"<>|]', "", s)
+    s = " ".join((base or "").split())  # 앞뒤 공백 제거 + 연속 공백 → 한 칸 (정규식 없이)
+    s = s.translate(_FILENAME_FORBID_TBL)
     s = s.strip(" .")
     if not s:
         s = fallback
@@ -190,9 +639,27 @@ def make_safe_filename(base: str, fallback: str = "clip", max_len: int = 80) ->
     return s
 
 
+def clip_safe_base(clip: Dict[str, Any]) -> str:
+    return make_safe_filename((clip.get("transcript") or "").strip(), fallback="clip", max_len=80)
+
+
 # =========================
 # Audio tools (ffmpeg)
 # =========================
+def audio_duration(path: Path) -> float:
+    # libavformat(PyAV)로 같은 프로세스 안에서 헤더만 읽음, 길이가 안 나오면 ffprobe로
+    try:
+        with av.open(str(path)) as container:
+            if container.duration:
+                return float(container.duration) / av.time_base
+            for st in container.streams.audio:
+                if st.duration and st.time_base:
+                    return float(st.duration * st.time_base)
+    except Exception:
+        pass
+    return ffprobe_duration(path)
+
+
 def ffprobe_duration(path: Path) -> float:
     try:
         out = subprocess.check_output(
@@ -207,37 +674,233 @@ def ffprobe_duration(path: Path) -> float:
         return 0.0
 
 
-def extract_clip(src: Path, start_s: float, end_s: float, dst: Path):
+def _is_pcm16_wav(path: Path) -> bool:
+    # 원본이 이미 16bit PCM wav면 다시 인코딩할 필요 없이 잘라서 복사만 하면 됨
+    if path.suffix.lower() != ".wav":
+        return False
+    try:
+        with wave.open(str(path), "rb") as w:
+            return w.getsampwidth() == 2
+    except Exception:
+        return False
+
+
+def _clip_ffmpeg_args(src: Path, start_s: float, end_s: float) -> List[str]:
     """
     -to 대신 -t(길이) 사용: '항상 2초로 잘림' 같은 문제를 근본 차단
+    -ss/-t를 -i 앞에 둬서 입력 단계에서 바로 탐색 (처음부터 디코딩하지 않음)
     """
-    dst.parent.mkdir(parents=True, exist_ok=True)
-
     start_s = max(0.0, float(start_s))
     end_s = max(start_s + 0.01, float(end_s))
     dur_s = max(0.01, end_s - start_s)
 
-    subprocess.check_call([
+    args = [
         "ffmpeg", "-y",
         "-hide_banner", "-loglevel", "error",
-        "-i", str(src),
+        "-threads", "1",  # 짧은 구간이라 스레드 여러 개 띄우는 게 더 손해 (동시 요청끼리 코어 경합)
         "-ss", f"{start_s:.3f}",
         "-t", f"{dur_s:.3f}",
+        "-i", str(src),
         "-vn",
-        "-acodec", "pcm_s16le",
-        "-ar", "44100",
-        "-ac", "2",
-        str(dst)
-    ])
+    ]
+    if _is_pcm16_wav(src):
+        args += ["-c:a", "copy"]
+    else:
+        args += _PCM_OUT_ARGS
+    return args
+
+
+_PCM_OUT_ARGS = ["-acodec", "pcm_s16le", "-ar", "44100", "-ac", "2"]
+CLIP_BATCH_MAX = 32  # ffmpeg 한 번에 뽑는 클립 수 (명령줄/필터 그래프가 너무 길어지지 않게)
+
+
+def extract_clips_batch(src: Path, cuts: List[Tuple[float, float, Path]]):
+    """
+    같은 원본에서 여러 구간을 ffmpeg 한 번으로 잘라냄 (asplit + atrim)
+    클립마다 프로세스 띄우고 디코더 여는 비용을 CLIP_BATCH_MAX개당 한 번으로
+    """
+    cuts = sorted(cuts, key=lambda c: c[0])
+    for i in range(0, len(cuts), CLIP_BATCH_MAX):
+        _extract_clips_once(src, cuts[i:i + CLIP_BATCH_MAX])
+
+
+def _extract_clips_once(src: Path, cuts: List[Tuple[float, float, Path]]):
+    spans = []
+    for start_s, end_s, dst in cuts:
+        start_s = max(0.0, float(start_s))
+        end_s = max(start_s + 0.01, float(end_s))
+        spans.append((start_s, end_s, dst))
+
+    # 첫 구간 앞까지는 입력 단계에서 건너뛰고, 마지막 구간 끝에서 디코딩 멈춤
+    base = spans[0][0]
+    stop = max(e for _, e, _ in spans)
+
+    n = len(spans)
+    graph = [f"[0:a]asplit={n}" + "".join(f"[a{k}]" for k in range(n))]
+    for k, (start_s, end_s, _) in enumerate(spans):
+        graph.append(
+            f"[a{k}]atrim=start={start_s - base:.3f}:duration={end_s - start_s:.3f},"
+            f"asetpts=PTS-STARTPTS[o{k}]"
+        )
+
+    # 16bit PCM wav 원본은 stream_clip의 -c:a copy와 같은 포맷(샘플레이트/채널 그대로)으로 맞춤
+    codec = ["-acodec", "pcm_s16le"] if _is_pcm16_wav(src) else _PCM_OUT_ARGS
+
+    args = [
+        "ffmpeg", "-y",
+        "-hide_banner", "-loglevel", "error",
+        "-ss", f"{base:.3f}",
+        "-t", f"{stop - base:.3f}",
+        "-i", str(src),
+        "-filter_complex", ";".join(graph),
+    ]
+    tmps = []
+    for k, (_, _, dst) in enumerate(spans):
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_suffix(f".{uuid.uuid4().hex}.part")
+        tmps.append((tmp, dst))
+        args += ["-map", f"[o{k}]", *codec, "-f", "wav", str(tmp)]
+
+    try:
+        subprocess.check_call(args)
+        for tmp, dst in tmps:
+            tmp.replace(dst)
+    finally:
+        for tmp, _ in tmps:
+            tmp.unlink(missing_ok=True)
+
+
+def _fix_wav_sizes(path: Path):
+    # 파이프로 받은 wav는 RIFF/data 길이 칸이 비어 있어서(0xFFFFFFFF) 파일로 남길 때 채워 넣음
+    size = path.stat().st_size
+    with open(path, "r+b") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+            return
+        f.seek(4)
+        f.write(struct.pack("<I", size - 8))
+        pos = 12
+        while pos + 8 <= size:
+            f.seek(pos)
+            chunk_id = f.read(4)
+            (chunk_len,) = struct.unpack("<I", f.read(4))
+            if chunk_id == b"data":
+                f.seek(pos + 4)
+                f.write(struct.pack("<I", size - pos - 8))
+                return
+            pos += 8 + chunk_len + (chunk_len & 1)
+
+
+def stream_clip(src: Path, start_s: float, end_s: float, cache_path: Path) -> Optional[Iterator[bytes]]:
+    """
+    캐시에 없는 클립은 ffmpeg 출력을 파이프로 받아 바로 클라이언트로 흘려보내면서 캐시 파일에도 같이 씀
+    ffmpeg가 아무것도 못 내보내면(실패) None
+    """
+    proc = subprocess.Popen(
+        _clip_ffmpeg_args(src, start_s, end_s) + ["-f", "wav", "pipe:1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    first = proc.stdout.read(CLIP_STREAM_CHUNK)
+    if not first:
+        proc.wait()
+        return None
+
+    def gen() -> Iterator[bytes]:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(f".{uuid.uuid4().hex}.part")
+        done = False
+        try:
+            with open(tmp, "wb") as f:
+                chunk = first
+                while chunk:
+                    f.write(chunk)
+                    yield chunk
+                    chunk = proc.stdout.read(CLIP_STREAM_CHUNK)
+            if proc.wait() == 0:
+                _fix_wav_sizes(tmp)
+                tmp.replace(cache_path)
+                done = True
+        finally:
+            # 클라이언트가 중간에 끊으면 여기로 옴
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            if not done:
+                tmp.unlink(missing_ok=True)
+
+    return gen()
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    # FileResponse(filename=...)와 같은 형식 (한글 파일명은 RFC 5987)
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+# =========================
+# Clip cache (clips_cache/{clip_id}_{start}_{end}.wav)
+# =========================
+def clip_cache_path(clip: Dict[str, Any]) -> Path:
+    return CACHE_DIR / f"{clip['id']}_{float(clip['start_s']):.3f}_{float(clip['end_s']):.3f}.wav"
+
+
+def delete_cached_clips(clips):
+    # 캐시 파일명은 클립 기록(id, start_s, end_s)으로 정해지니까 폴더를 훑지 않고 그 파일만 바로 지움
+    # (예전 형식 등으로 남은 파일은 시작할 때 sweep_clip_cache가 한 번에 정리)
+    for c in clips:
+        try:
+            os.unlink(clip_cache_path(c))
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+
+
+# 이것보다 최근에 수정된 파일은 정리하지 않음
+# (시작 직후 들어온 요청이 쓰는 중인 .part / 스냅샷 뒤에 생긴 클립 캐시를 지우지 않게)
+CLIP_SWEEP_MIN_AGE = float(os.environ.get("CLIP_SWEEP_MIN_AGE", "3600"))
+
+
+def sweep_clip_cache():
+    """
+    어떤 클립의 캐시 파일도 아닌 것(삭제된 클립, 중간에 끊긴 .part)을 os.scandir 한 번으로 정리
+    서버 시작할 때 백그라운드로 한 번만 돌림. CLIP_SWEEP_MIN_AGE보다 오래된 파일만 지움
+    """
+    cutoff = time.time() - CLIP_SWEEP_MIN_AGE
+    with DATA_LOCK:
+        keep = set()
+        for c in get_store().data["clips"]:
+            try:
+                keep.add(clip_cache_path(c).name)
+            except (KeyError, TypeError, ValueError):
+                pass
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for e in it:
+                name = e.name
+                if (name.endswith(".wav") and name not in keep) or name.endswith(".part"):
+                    try:
+                        if e.stat().st_mtime < cutoff:
+                            os.unlink(e.path)
+                    except OSError:
+                        # 이미 없어졌거나, Windows에서 아직 재생/전송 중이라 열려 있으면 PermissionError → 건너뛰고 계속
+                        pass
+    except OSError:
+        pass
 
 
 # =========================
 # Common sanitize
 # =========================
+# str.isspace()인 글자 전부 (= 정규식 \s) 지우는 translate 표
+_WS_DEL_TBL = dict.fromkeys((c for c in range(0x3001) if chr(c).isspace()), None)
+
+
 def sanitize_text_keep_unicode(s: str) -> str:
-    s = (s or "").strip()
-    s = re.sub(r"\s+", "", s)
-    return s
+    # 공백은 어디 있든 전부 지우니까 strip + \s+ 치환 대신 translate 한 번
+    return (s or "").translate(_WS_DEL_TBL)
 
 
 # =========================
@@ -252,32 +915,44 @@ def is_hangul_syllable(ch: str) -> bool:
     return 0xAC00 <= ord(ch) <= 0xD7A3
 
 
+# 검색어 정규화 결과 캐시 크기 (같은 검색어를 다시 치면 dict 조회 한 번)
+NORM_CACHE_SIZE = 4096
+
+_KO_PUNCT_TBL = str.maketrans("", "", "\"'.,!?(){}[]:;~`@#$%^&*+=/\\|<>—-")
+_KO_STRIP_TBL = {**_WS_DEL_TBL, **_KO_PUNCT_TBL}  # 공백 + 기호를 한 번에 지움
+
+
 def sanitize_for_ko(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"\s+", "", s)
-    s = re.sub(r"[\"'.,!?(){}\[\]:;~`@#$%^&*+=/\\|<>—\-]", "", s)
-    return s
+    return (s or "").lower().translate(_KO_STRIP_TBL)
+
+
+# 완성형 음절 11172자 → (초성, 중성, 종성), 음절 번호(code - 0xAC00)로 바로 꺼내 씀
+# (글자마다 588/28로 나누고 리스트 세 번 찾던 걸 표 한 번 찾기로)
+_SYLLABLE_PARTS: List[Tuple[str, str, str]] = [
+    (_CHO[idx // 588], _JUNG[(idx % 588) // 28], _JONG[idx % 28])
+    for idx in range(0xD7A3 - 0xAC00 + 1)
+]
+
+
+def _build_jamo_table() -> Dict[int, str]:
+    # 완성형 음절 11172자 → 초성+중성(+종성) 자모 문자열, str.translate용
+    return {0xAC00 + idx: "".join(parts) for idx, parts in enumerate(_SYLLABLE_PARTS)}
+
+
+_JAMO_TABLE = _build_jamo_table()
 
 
 def hangul_to_jamo(s: str) -> str:
-    out = []
-    for ch in s:
-        code = ord(ch)
-        if 0xAC00 <= code <= 0xD7A3:
-            idx = code - 0xAC00
-            cho = idx // 588
-            jung = (idx % 588) // 28
-            jong = idx % 28
-            out.append(_CHO[cho])
-            out.append(_JUNG[jung])
-            if _JONG[jong]:
-                out.append(_JONG[jong])
-        else:
-            if ch.isalnum():
-                out.append(ch.lower())
-    return "".join(out)
+    # 음절 분해는 translate(C 루프)로 한 번에, 나머지 글자는 영숫자만 소문자로 남김
+    t = s.translate(_JAMO_TABLE)
+    if not t.isalnum():
+        t = "".join(filter(str.isalnum, t))
+    if t.lower() == t:
+        return t
+    return "".join(ch.lower() for ch in t)
 
 
+@lru_cache(maxsize=NORM_CACHE_SIZE)
 def norm_basic(s: str) -> str:
     return hangul_to_jamo(sanitize_for_ko(s))
 
@@ -303,16 +978,15 @@ def simplify_final_for_pron(jong: str) -> str:
     return JONG_TO_ONSET.get(jong, jong)
 
 
-def decompose_syllables_ko(s: str) -> List[Dict[str, str]]:
-    s2 = sanitize_for_ko(s)
+def _decompose_sanitized(s2: str) -> List[Dict[str, str]]:
+    # sanitize_for_ko를 이미 거친 문자열용 (normalize_all에서 sanitize 중복 방지)
     items: List[Dict[str, str]] = []
+    parts = _SYLLABLE_PARTS
+    n_parts = len(parts)
     for ch in s2:
-        code = ord(ch)
-        if 0xAC00 <= code <= 0xD7A3:
-            idx = code - 0xAC00
-            cho = _CHO[idx // 588]
-            jung = _JUNG[(idx % 588) // 28]
-            jong = _JONG[idx % 28]
+        idx = ord(ch) - 0xAC00
+        if 0 <= idx < n_parts:
+            cho, jung, jong = parts[idx]
             items.append({"type": "hangul", "cho": cho, "jung": jung, "jong": jong})
         else:
             if ch.isalnum():
@@ -387,21 +1061,24 @@ def syllables_to_jamo(items: List[Dict[str, str]]) -> str:
     return "".join(out)
 
 
+@lru_cache(maxsize=NORM_CACHE_SIZE)
 def norm_ko_sound(s: str) -> str:
-    items = decompose_syllables_ko(s)
+    return _ko_sound_sanitized(sanitize_for_ko(s))
+
+
+def _ko_sound_sanitized(s2: str) -> str:
+    items = _decompose_sanitized(s2)
     apply_liaison(items)
     apply_assimilation(items)
 
-    out_items: List[Dict[str, str]] = []
+    # items는 여기서 새로 만든 것이라 복사 없이 종성만 대표음으로 바꿔 씀
+    to_onset = JONG_TO_ONSET
     for it in items:
-        if it["type"] == "other":
-            out_items.append(it)
-        else:
-            it2 = dict(it)
-            it2["jong"] = simplify_final_for_pron(it.get("jong") or "")
-            out_items.append(it2)
+        jong = it.get("jong")
+        if jong:
+            it["jong"] = to_onset.get(jong, jong)  # simplify_final_for_pron과 같음
 
-    return syllables_to_jamo(out_items)
+    return syllables_to_jamo(items)
 
 
 # =========================
@@ -422,6 +1099,7 @@ def kata_to_hira(ch: str) -> str:
     return ch
 
 
+@lru_cache(maxsize=NORM_CACHE_SIZE)
 def jp_kana_norm(text: str) -> str:
     t = sanitize_text_keep_unicode(text)
     out = []
@@ -435,6 +1113,33 @@ def jp_kana_norm(text: str) -> str:
     return "".join(out)
 
 
+# 가타카나(ァ~ヶ) → 히라가나, jp_kana_norm과 같은 매핑
+_KATA_TO_HIRA_TBL = {c: c - 0x60 for c in range(0x30A1, 0x30F6 + 1)}
+
+
+def _jp_kana_sanitized(s2: str) -> str:
+    # 가나(0x3040~0x30FF)만 남김. sanitize_for_ko가 지우는 공백/기호는 어차피 가나가 아님
+    t = s2.translate(_KATA_TO_HIRA_TBL)
+    return "".join(ch for ch in t if "\u3040" <= ch <= "\u30ff")
+
+
+def normalize_all(text: str) -> Tuple[str, str, str]:
+    """
+    (norm, ko_pron_norm, jp_kana_norm)을 한 번에 계산
+    sanitize는 한 번만 하고 세 정규화가 같이 씀 (STT 세그먼트마다 호출)
+    """
+    s2 = sanitize_for_ko(text)
+    basic = hangul_to_jamo(s2)
+    if _HANGUL_RE.search(s2):
+        ko_pron = _ko_sound_sanitized(s2)
+    else:
+        # 한글 음절이 없으면 연음/동화할 게 없어서 영숫자만 남긴 것과 같음 (음절 분해 생략)
+        ko_pron = "".join(filter(str.isalnum, s2))
+    # 가나가 하나도 없으면(한국어 대사 대부분) 가나 추출 생략
+    jp_kana = _jp_kana_sanitized(s2) if _KANA_RE.search(s2) else ""
+    return basic, ko_pron, jp_kana
+
+
 _ROMAJI_TABLE = [
     ("kya", "きゃ"), ("kyu", "きゅ"), ("kyo", "きょ"),
     ("gya", "ぎゃ"), ("gyu", "ぎゅ"), ("gyo", "ぎょ"),
@@ -471,38 +1176,60 @@ _ROMAJI_TABLE = [
 ]
 
 
+def _build_romaji_trie(table: List[Tuple[str, str]]) -> Dict[str, Any]:
+    # 글자 단위 트라이, 노드의 "" 키에 해당 위치에서 끝나는 가나를 둠
+    root: Dict[str, Any] = {}
+    for key, val in table:
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = val
+    return root
+
+
+# import 시 한 번만 만들어두고, 변환은 입력을 한 번 훑으면서 최장 일치로 처리
+_ROMAJI_TRIE = _build_romaji_trie(_ROMAJI_TABLE)
+_SOKUON_CONSONANTS = frozenset("kstphgzbdrjmc")
+_NON_AZ_RE = re.compile(r"[^a-z]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_KANA_RE = re.compile("[\u3040-\u30ff]")      # is_hiragana or is_katakana
+_HANGUL_RE = re.compile("[\uac00-\ud7a3]")    # is_hangul_syllable
+
+
+@lru_cache(maxsize=NORM_CACHE_SIZE)
 def romaji_to_hiragana(s: str) -> str:
-    x = re.sub(r"[^a-z]", "", (s or "").lower())
+    x = _NON_AZ_RE.sub("", (s or "").lower())
     if not x:
         return ""
     out = []
+    n = len(x)
     i = 0
-    while i < len(x):
-        if i + 1 < len(x) and x[i] == x[i + 1] and x[i] in "kstphgzbdrjmc":
+    while i < n:
+        ch = x[i]
+        if i + 1 < n and ch == x[i + 1] and ch in _SOKUON_CONSONANTS:
             out.append("っ")
             i += 1
             continue
-        matched = False
-        for key, val in _ROMAJI_TABLE:
-            if x.startswith(key, i):
-                out.append(val)
-                i += len(key)
-                matched = True
+        node = _ROMAJI_TRIE
+        val = None
+        end = i
+        j = i
+        while j < n:
+            node = node.get(x[j])
+            if node is None:
                 break
-        if not matched:
+            j += 1
+            if "" in node:
+                val = node[""]
+                end = j
+        if val is None:
             i += 1
+        else:
+            out.append(val)
+            i = end
     return "".join(out)
 
 
-def hangul_syllable_to_chojung(ch: str) -> Optional[Tuple[str, str]]:
-    if not is_hangul_syllable(ch):
-        return None
-    idx = ord(ch) - 0xAC00
-    cho = _CHO[idx // 588]
-    jung = _JUNG[(idx % 588) // 28]
-    return cho, jung
-
-
 KO_ONSET_TO_ROMA = {
     "ㅇ": "", "ㄱ": "g", "ㄲ": "k", "ㅋ": "k",
     "ㄴ": "n", "ㄷ": "d", "ㄸ": "t", "ㅌ": "t",
@@ -519,40 +1246,196 @@ KO_VOWEL_TO_ROMA = {
 }
 
 
+def _build_hangul_romaji_table() -> Dict[int, str]:
+    # 완성형 음절 11172자 → 초성+중성 로마자 (종성은 안 읽음), str.translate용
+    table: Dict[int, str] = {}
+    for idx in range(0xD7A3 - 0xAC00 + 1):
+        cho = _CHO[idx // 588]
+        jung = _JUNG[(idx % 588) // 28]
+        table[0xAC00 + idx] = KO_ONSET_TO_ROMA.get(cho, "") + KO_VOWEL_TO_ROMA.get(jung, "")
+    return table
+
+
+_HANGUL_ROMAJI_TABLE = _build_hangul_romaji_table()
+
+
+@lru_cache(maxsize=NORM_CACHE_SIZE)
 def hangul_to_hiragana_guess(s: str) -> str:
-    s2 = sanitize_text_keep_unicode(s)
-    romaji = []
-    for ch in s2:
-        cj = hangul_syllable_to_chojung(ch)
-        if not cj:
-            if ("a" <= ch.lower() <= "z"):
-                romaji.append(ch.lower())
-            continue
-        cho, jung = cj
-        r1 = KO_ONSET_TO_ROMA.get(cho, "")
-        r2 = KO_VOWEL_TO_ROMA.get(jung, "")
-        romaji.append(r1 + r2)
-    return romaji_to_hiragana("".join(romaji))
+    # 음절 → 로마자는 표 하나로 한 번에 바꾸고, 한글이 아닌 글자는 romaji_to_hiragana가 a-z만 남기고 걸러냄
+    return romaji_to_hiragana(sanitize_text_keep_unicode(s).translate(_HANGUL_ROMAJI_TABLE))
 
 
 # =========================
 # Scoring
 # =========================
-def score_contains(needle: str, hay: str) -> int:
-    if not needle:
-        return 0
-    if needle in hay:
-        return 100
-    n = 3
-    if len(needle) < n or len(hay) < n:
-        return 0
-    a = {hay[i:i + n] for i in range(len(hay) - n + 1)}
-    b = {needle[i:i + n] for i in range(len(needle) - n + 1)}
-    if not a or not b:
-        return 0
-    inter = len(a & b)
-    union = len(a | b)
-    return int(100 * (inter / union))
+NGRAM_N = 3
+
+
+def ngram_set(s: str) -> set:
+    n = NGRAM_N
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+# =========================
+# Search index (모드별 trigram 역색인)
+# - 클립마다 검색용 문자열(hay)과 trigram 집합을 한 번만 계산해두고, trigram → clip_id 목록으로 후보만 채점
+# - load_data()가 파일을 다시 읽으면 버리고, 다음 검색 때 다시 만듦
+# - 클립 추가/삭제 시 DataStore.add_clips / remove_clips 가 index_add_clips / index_remove_clips 로 같이 갱신
+# =========================
+SEARCH_MODES = ("basic", "ko_sound", "jp_sound")
+
+
+def clip_hay(c: Dict[str, Any], mode: str) -> str:
+    # 해당 모드에서 검색 대상이 아니면 ""
+    txt = c.get("transcript") or ""
+    if mode == "basic":
+        return c.get("norm") or norm_basic(txt)
+    if mode == "ko_sound":
+        if not any(is_hangul_syllable(ch) for ch in txt):
+            return ""
+        return c.get("ko_pron_norm") or norm_ko_sound(txt)
+    return c.get("jp_kana_norm") or jp_kana_norm(txt)
+
+
+class SearchIndex:
+    """
+    열(column) 단위로 저장: 클립 하나 = 행 번호 하나, 필드마다 같은 길이의 리스트
+    검색 루프는 필요한 열(hay, trigram 개수, profile_id, created_at)만 행 번호로 꺼내 씀
+    삭제된 행은 비워두고(tombstone), 절반 넘게 비면 한 번에 압축
+    """
+
+    def __init__(self, clips: List[Dict[str, Any]]):
+        self._reset(clips)
+
+    def _reset(self, clips: List[Dict[str, Any]]):
+        self.row_of: Dict[str, int] = {}
+        self.clips: List[Optional[Dict[str, Any]]] = []
+        self.profile_ids: List[str] = []
+        self.created_at: List[str] = []
+        self.hay: Dict[str, List[str]] = {m: [] for m in SEARCH_MODES}
+        # trigram 집합 자체는 들고 있지 않고 개수만 (점수 계산엔 |hay trigram|만 필요, 삭제 땐 hay로 다시 만듦)
+        self.gram_count: Dict[str, List[int]] = {m: [] for m in SEARCH_MODES}
+        self.postings: Dict[str, Dict[str, set]] = {m: defaultdict(set) for m in SEARCH_MODES}
+        # (created_at, -row) 오름차순 유지 → 최신순은 뒤에서부터 읽기만 하면 됨 (동점은 먼저 들어온 클립이 앞)
+        self.by_created: List[Tuple[str, int]] = []
+        self.by_created_profile: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        self.add(clips)
+
+    def add(self, clips: List[Dict[str, Any]]):
+        for c in clips:
+            cid = c.get("id")
+            if not cid:
+                continue
+            if cid in self.row_of:
+                continue  # 중복 id면 앞에 있는 것만 (DataStore._by_id/get_clip과 같은 규칙)
+            row = len(self.clips)  # 행 번호 = 추가 순서 (동점 정렬에 그대로 씀)
+            self.row_of[cid] = row
+            self.clips.append(c)
+            self.profile_ids.append(c.get("profile_id") or "")
+            self.created_at.append(c.get("created_at", ""))
+            key = (self.created_at[row], -row)
+            bisect.insort(self.by_created, key)
+            bisect.insort(self.by_created_profile[self.profile_ids[row]], key)
+            for mode in SEARCH_MODES:
+                hay = clip_hay(c, mode)
+                grams = ngram_set(hay) if hay else ()
+                self.hay[mode].append(hay)
+                self.gram_count[mode].append(len(grams))
+                postings = self.postings[mode]
+                for g in grams:
+                    postings[g].add(row)
+
+    def remove(self, clip_ids):
+        for cid in clip_ids:
+            row = self.row_of.pop(cid, None)
+            if row is None:
+                continue
+            self.clips[row] = None
+            for mode in SEARCH_MODES:
+                hay = self.hay[mode][row]
+                grams = ngram_set(hay) if hay else ()
+                self.hay[mode][row] = ""
+                self.gram_count[mode][row] = 0
+                postings = self.postings[mode]
+                for g in grams:
+                    rows = postings.get(g)
+                    if rows is not None:
+                        rows.discard(row)
+                        if not rows:
+                            del postings[g]
+        if len(self.row_of) * 2 < len(self.clips):
+            self._reset([c for c in self.clips if c is not None])
+
+    def recent(self, limit: int, profile_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # 검색어가 없을 때: created_at 최신순 limit개 (삭제된 행은 건너뜀)
+        keys = self.by_created_profile.get(profile_id, []) if profile_id else self.by_created
+        out: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return out
+        for _, neg_row in reversed(keys):
+            c = self.clips[-neg_row]
+            if c is None:
+                continue
+            out.append(c)
+            if len(out) >= limit:
+                break
+        return out
+
+    def scores(self, mode: str, needle: str) -> Dict[int, int]:
+        """
+        부분일치면 100, 아니면 trigram 자카드 유사도(0~100)를 후보 행에 대해서만 계산 (행 번호 → 점수)
+        교집합 크기는 검색어 trigram의 posting을 한꺼번에 세서 구하고 (클립마다 집합 연산 안 함),
+        합집합 크기는 |a| + |b| - 교집합 으로 계산
+        """
+        hays = self.hay[mode]
+        needle_grams = ngram_set(needle)
+        if not needle_grams:
+            # trigram이 안 나오는 짧은 검색어는 부분일치만 가능
+            return {row: 100 for row, hay in enumerate(hays) if hay and needle in hay}
+
+        inter: Counter = Counter()
+        postings = self.postings[mode]
+        for g in needle_grams:
+            rows = postings.get(g)
+            if rows:
+                inter.update(rows)
+
+        nb = len(needle_grams)
+        gram_count = self.gram_count[mode]
+        out: Dict[int, int] = {}
+        for row, k in inter.items():
+            # 부분일치면 검색어 trigram이 전부 들어있으니 그때만 문자열 비교
+            if k == nb and needle in hays[row]:
+                out[row] = 100
+                continue
+            s = int(100 * (k / (gram_count[row] + nb - k)))
+            if s > 0:
+                out[row] = s
+        return out
+
+
+_SEARCH_INDEX: Optional[SearchIndex] = None
+
+
+def get_search_index() -> SearchIndex:
+    global _SEARCH_INDEX
+    with DATA_LOCK:
+        data = load_data()
+        if _SEARCH_INDEX is None:
+            _SEARCH_INDEX = SearchIndex(data["clips"])
+        return _SEARCH_INDEX
+
+
+def index_add_clips(clips: List[Dict[str, Any]]):
+    with DATA_LOCK:
+        if _SEARCH_INDEX is not None:
+            _SEARCH_INDEX.add(clips)
+
+
+def index_remove_clips(clip_ids):
+    with DATA_LOCK:
+        if _SEARCH_INDEX is not None:
+            _SEARCH_INDEX.remove(clip_ids)
 
 
 # =========================
@@ -581,38 +1464,24 @@ def api_create_profile(name: str = Form(...)):
     if not name:
         return JSONResponse({"error": "프로필 이름이 비어있어요."}, status_code=400)
 
-    data = load_data()
     pid = str(uuid.uuid4())
-    data["profiles"].append({"id": pid, "name": name, "created_at": now_iso()})
-    save_data(data)
+    with data_transaction() as store:
+        store.add_profile({"id": pid, "name": name, "created_at": now_iso()})
     return {"ok": True, "profile": {"id": pid, "name": name}}
 
 
 @app.delete("/api/profiles/{profile_id}")
 def api_delete_profile(profile_id: str):
-    data = load_data()
-    if not any(p["id"] == profile_id for p in data["profiles"]):
-        return JSONResponse({"error": "프로필을 찾을 수 없어요."}, status_code=404)
+    with data_transaction() as store:
+        if not store.profile(profile_id):
+            return JSONResponse({"error": "프로필을 찾을 수 없어요."}, status_code=404)
 
-    clips_to_delete = [c for c in data["clips"] if c.get("profile_id") == profile_id]
-    audio_ids = set(c.get("audio_id") for c in clips_to_delete)
+        clip_ids = [c.get("id") for c in store.profile_clips(profile_id)]
+        store.remove_profile(profile_id)
+        clips_to_delete = store.remove_clips(clip_ids)
+        audios_to_delete = store.remove_audios(set(c.get("audio_id") for c in clips_to_delete))
 
-    data["profiles"] = [p for p in data["profiles"] if p.get("id") != profile_id]
-    data["clips"] = [c for c in data["clips"] if c.get("profile_id") != profile_id]
-
-    audios_to_delete = [a for a in data["audios"] if a.get("id") in audio_ids]
-    data["audios"] = [a for a in data["audios"] if a.get("id") not in audio_ids]
-
-    save_data(data)
-
-    try:
-        for c in clips_to_delete:
-            cid = c.get("id")
-            if cid:
-                for f in CACHE_DIR.glob(f"{cid}_*.wav"):
-                    f.unlink(missing_ok=True)
-    except Exception:
-        pass
+    delete_cached_clips(clips_to_delete)
 
     try:
         for a in audios_to_delete:
@@ -638,22 +1507,12 @@ def _bulk_delete_impl(clip_ids: List[str]) -> Dict[str, Any]:
     if not clip_ids:
         return {"ok": True, "deleted": 0}
 
-    data = load_data()
-    id_set = set(clip_ids)
-
-    existing = [c for c in data["clips"] if c.get("id") in id_set]
+    with data_transaction() as store:
+        existing = store.remove_clips(clip_ids)
     if not existing:
         return {"ok": True, "deleted": 0}
 
-    data["clips"] = [c for c in data["clips"] if c.get("id") not in id_set]
-    save_data(data)
-
-    for cid in clip_ids:
-        try:
-            for f in CACHE_DIR.glob(f"{cid}_*.wav"):
-                f.unlink(missing_ok=True)
-        except Exception:
-            pass
+    delete_cached_clips(existing)
 
     return {"ok": True, "deleted": len(existing)}
 
@@ -670,19 +1529,12 @@ def api_bulk_delete_clips(req: BulkDeleteRequest):
 
 @app.delete("/api/clips/{clip_id}")
 def api_delete_clip(clip_id: str):
-    data = load_data()
-    clip = next((c for c in data["clips"] if c.get("id") == clip_id), None)
-    if not clip:
+    with data_transaction() as store:
+        removed = store.remove_clips([clip_id])
+    if not removed:
         return JSONResponse({"error": "클립을 찾을 수 없어요."}, status_code=404)
 
-    data["clips"] = [c for c in data["clips"] if c.get("id") != clip_id]
-    save_data(data)
-
-    try:
-        for f in CACHE_DIR.glob(f"{clip_id}_*.wav"):
-            f.unlink(missing_ok=True)
-    except Exception:
-        pass
+    delete_cached_clips(removed)
 
     return {"ok": True}
 
@@ -697,60 +1549,49 @@ def api_search(
     limit: int = 50,
     mode: str = "basic",
 ):
-    data = load_data()
     mode = (mode or "basic").lower()
     if mode not in ("basic", "ko_sound", "jp_sound"):
         mode = "basic"
 
-    clips = data["clips"]
-    if profile_id:
-        clips = [c for c in clips if c.get("profile_id") == profile_id]
-
     if mode == "basic":
         needle = norm_basic(q)
     elif mode == "ko_sound":
         needle = norm_ko_sound(q)
     else:
         raw = sanitize_text_keep_unicode(q)
-        has_kana = any(is_hiragana(ch) or is_katakana(ch) for ch in raw)
-        has_latin = bool(re.search(r"[A-Za-z]", raw))
-        has_hangul = any(is_hangul_syllable(ch) for ch in raw)
-
-        if has_kana:
+        if _KANA_RE.search(raw):
             needle = jp_kana_norm(raw)
-        elif has_latin:
+        elif _LATIN_RE.search(raw):
             needle = romaji_to_hiragana(raw)
-        elif has_hangul:
+        elif _HANGUL_RE.search(raw):
             needle = hangul_to_hiragana_guess(raw)
         else:
             needle = ""
 
-    if not needle:
-        clips_sorted = sorted(clips, key=lambda c: c.get("created_at", ""), reverse=True)[:limit]
-        return {"results": clips_sorted}
+    index = get_search_index()
 
-    scored: List[Tuple[int, Dict[str, Any]]] = []
+    if not needle:
+        with DATA_LOCK:
+            return {"results": index.recent(limit, profile_id)}
 
-    for c in clips:
-        txt = c.get("transcript") or ""
+    scored: List[Tuple[int, str, int]] = []
 
-        if mode == "basic":
-            hay = c.get("norm") or norm_basic(txt)
-        elif mode == "ko_sound":
-            if not any(is_hangul_syllable(ch) for ch in txt):
+    with DATA_LOCK:
+        profile_ids = index.profile_ids
+        created_at = index.created_at
+        for row, s in index.scores(mode, needle).items():
+            if profile_id and profile_ids[row] != profile_id:
                 continue
-            hay = c.get("ko_pron_norm") or norm_ko_sound(txt)
+            scored.append((s, created_at[row], -row))  # 동점이면 먼저 들어온 클립이 앞
+        if 0 <= limit < len(scored):
+            # 후보 전체를 정렬하지 않고 상위 limit개만 힙으로 뽑음 (O(n log k))
+            top = heapq.nlargest(limit, scored)
         else:
-            hay = c.get("jp_kana_norm") or jp_kana_norm(txt)
-            if not hay:
-                continue
-
-        s = score_contains(needle, hay)
-        if s > 0:
-            scored.append((s, c))
+            scored.sort(reverse=True)
+            top = scored[:limit]
+        results = [index.clips[-neg_row] for _, _, neg_row in top]
 
-    scored.sort(key=lambda x: (x[0], x[1].get("created_at", "")), reverse=True)
-    return {"results": [c for _, c in scored[:limit]]}
+    return {"results": results}
 
 
 # =========================
@@ -758,12 +1599,12 @@ def api_search(
 # =========================
 @app.get("/api/clip_audio/{clip_id}")
 def api_clip_audio(clip_id: str):
-    data = load_data()
-    clip = next((c for c in data["clips"] if c.get("id") == clip_id), None)
+    store = get_store()
+    clip = store.clip(clip_id)
     if not clip:
         return JSONResponse({"error": "클립을 찾을 수 없어요."}, status_code=404)
 
-    audio = next((a for a in data["audios"] if a.get("id") == clip.get("audio_id")), None)
+    audio = store.audio(clip.get("audio_id"))
     if not audio:
         return JSONResponse({"error": "원본 오디오를 찾을 수 없어요."}, status_code=404)
 
@@ -773,40 +1614,31 @@ def api_clip_audio(clip_id: str):
 
     start_s = float(clip["start_s"])
     end_s = float(clip["end_s"])
+    cache_path = clip_cache_path(clip)
 
-    cache_name = f"{clip_id}_{start_s:.3f}_{end_s:.3f}.wav"
-    cache_path = CACHE_DIR / cache_name
+    dl_name = store.download_name(clip)
 
-    if not cache_path.exists():
-        try:
-            extract_clip(src, start_s, end_s, cache_path)
-        except subprocess.CalledProcessError as e:
-            return JSONResponse({"error": f"ffmpeg 실패: {e}"}, status_code=500)
-
-    transcript = (clip.get("transcript") or "").strip()
-    safe_base = make_safe_filename(transcript, fallback="clip", max_len=80)
-
-    same = []
-    for c in data.get("clips", []):
-        t = (c.get("transcript") or "").strip()
-        b = make_safe_filename(t, fallback="clip", max_len=80)
-        if b == safe_base:
-            same.append(c)
-
-    same.sort(key=lambda x: ((x.get("created_at") or ""), (x.get("id") or "")))
-
-    idx = 0
-    for i, c in enumerate(same):
-        if c.get("id") == clip_id:
-            idx = i + 1
-            break
-
-    if len(same) <= 1 or idx <= 1:
-        dl_name = f"{safe_base}.wav"
-    else:
-        dl_name = f"{safe_base} ({idx}).wav"
+    if cache_path.exists():
+        return FileResponse(cache_path, media_type="audio/wav", filename=dl_name)
 
-    return FileResponse(cache_path, media_type="audio/wav", filename=dl_name)
+    if end_s - start_s < CLIP_STREAM_MIN_SECONDS:
+        # 짧은 클립은 다 잘라서 캐시에 넣고 그 파일을 보냄 (자르는 시간이 짧아서 스트리밍 이득이 없음)
+        # → 첫 요청부터 wav 길이 칸/Content-Length/Range가 맞아서 재생 시간 표시·탐색이 됨
+        try:
+            extract_clips_batch(src, [(start_s, end_s, cache_path)])
+        except (OSError, subprocess.CalledProcessError):
+            return JSONResponse({"error": "ffmpeg 실패: 오디오를 잘라내지 못했어요."}, status_code=500)
+        return FileResponse(cache_path, media_type="audio/wav", filename=dl_name)
+
+    # 긴 클립만 ffmpeg 출력을 바로 흘려보냄 (첫 응답은 길이 칸이 비어 있고 탐색 불가, 다음부터는 캐시 파일)
+    body = stream_clip(src, start_s, end_s, cache_path)
+    if body is None:
+        return JSONResponse({"error": "ffmpeg 실패: 오디오를 잘라내지 못했어요."}, status_code=500)
+    return StreamingResponse(
+        body,
+        media_type="audio/wav",
+        headers={"Content-Disposition": content_disposition(dl_name)},
+    )
 
 
 # =========================
@@ -822,9 +1654,7 @@ def api_job(job_id: str):
 
 @app.post("/api/jobs/{job_id}/cancel")
 def api_cancel_job(job_id: str):
-    with JOBS_LOCK:
-        exists = job_id in JOBS
-    if not exists:
+    if _job_entry(job_id, create=False) is None:
         return JSONResponse({"error": "job을 찾을 수 없어요."}, status_code=404)
 
     fut = _get_future(job_id)
@@ -843,7 +1673,78 @@ def api_cancel_job(job_id: str):
 # =========================
 # Background STT job (Executor에서 실행)
 # =========================
-def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path):
+def _speech_chunks(audio) -> List[Tuple[int, int]]:
+    """
+    VAD 말소리 구간들을 STT_CHUNK_SECONDS 안쪽으로 묶어서 (시작, 끝) 샘플 위치로 돌려줌
+    구간 경계가 무음 위에 오도록 말소리 중간은 자르지 않음
+    """
+    limit = int(STT_CHUNK_SECONDS * STT_SAMPLE_RATE)
+    chunks: List[Tuple[int, int]] = []
+    cur_start = cur_end = -1
+    for ts in get_speech_timestamps(audio):
+        start, end = int(ts["start"]), int(ts["end"])
+        if cur_start < 0:
+            cur_start, cur_end = start, end
+        elif end - cur_start <= limit:
+            cur_end = end
+        else:
+            chunks.append((cur_start, cur_end))
+            cur_start, cur_end = start, end
+    if cur_start >= 0:
+        chunks.append((cur_start, cur_end))
+    return chunks
+
+
+def transcribe_parallel(saved_path: Path, cancel_ev: threading.Event) -> Iterator[Tuple[float, float, str]]:
+    """
+    긴 파일을 구간별로 CHUNK_EXECUTOR에서 동시에 디코딩하고, 결과는 시간 순서대로 내보냄
+    (start_s, end_s, text), 시간은 원본 기준으로 맞춰서
+    """
+    audio = decode_audio(str(saved_path), sampling_rate=STT_SAMPLE_RATE)
+    model = get_whisper_model()
+    chunks = _speech_chunks(audio)
+    if not chunks:
+        return
+
+    def collect(segs, start: int) -> List[Tuple[float, float, str]]:
+        offset = start / STT_SAMPLE_RATE
+        return [(offset + seg.start, offset + seg.end, seg.text) for seg in segs]
+
+    def run(start: int, end: int, language: Optional[str]) -> List[Tuple[float, float, str]]:
+        if cancel_ev.is_set():
+            return []
+        segs, _ = model.transcribe(
+            audio[start:end],
+            task="transcribe",
+            language=language,
+            vad_filter=True,
+        )
+        return collect(segs, start)
+
+    # 언어는 첫 구간에서 한 번만 감지해서 모든 구간에 같은 언어로 (구간마다 감지하면 한 파일이 여러 언어로 섞임)
+    # transcribe가 돌아올 때 감지는 이미 끝나 있고, 세그먼트 디코딩은 풀에서 다른 구간과 같이 진행
+    first_start, first_end = chunks[0]
+    first_segs, info = model.transcribe(
+        audio[first_start:first_end],
+        task="transcribe",
+        language=None,
+        vad_filter=True,
+    )
+    language = info.language
+
+    futs = [CHUNK_EXECUTOR.submit(collect, first_segs, first_start)]
+    futs += [CHUNK_EXECUTOR.submit(run, start, end, language) for start, end in chunks[1:]]
+    try:
+        for fut in futs:
+            if cancel_ev.is_set():
+                break
+            yield from fut.result()
+    finally:
+        for fut in futs:
+            fut.cancel()  # 취소/에러로 빠져나오면 아직 시작 안 한 구간은 버림
+
+
+def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path, duration: float = 0.0):
     cancel_ev = _get_cancel_event(job_id)
 
     try:
@@ -853,35 +1754,53 @@ def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path):
 
         set_job(job_id, status="running", progress=0, message="STT 분석 시작...", clips_created=0)
 
-        duration = ffprobe_duration(saved_path)
-        model = get_whisper_model()
-
-        segments, info = model.transcribe(
-            str(saved_path),
-            task="transcribe",
-            language=None,
-            vad_filter=True,
-        )
+        if duration <= 0:
+            duration = audio_duration(saved_path)
+
+        if WHISPER_BATCH_SIZE > 1:
+            segments, info = get_batched_pipeline().transcribe(
+                str(saved_path),
+                task="transcribe",
+                language=None,
+                vad_filter=True,
+                batch_size=WHISPER_BATCH_SIZE,
+                # 기본값(True)이면 VAD 구간(최대 ~30초)이 통째로 세그먼트 하나가 됨 → 문장 단위로 받게
+                without_timestamps=False,
+            )
+            pieces = ((seg.start, seg.end, seg.text) for seg in segments)
+        elif STT_CHUNK_WORKERS > 1 and duration >= STT_PARALLEL_MIN_SECONDS:
+            pieces = transcribe_parallel(saved_path, cancel_ev)
+        else:
+            segments, info = get_whisper_model().transcribe(
+                str(saved_path),
+                task="transcribe",
+                language=None,
+                vad_filter=True,
+            )
+            pieces = ((seg.start, seg.end, seg.text) for seg in segments)
 
         created = 0
         last_p = 0.0
+        last_pct = -1
+        last_pub = 0.0
         new_clips: List[Dict[str, Any]] = []
 
-        for seg in segments:
+        for seg_start, seg_end, seg_text in pieces:
             if cancel_ev.is_set():
                 set_job(job_id, status="cancelled", progress=int(last_p * 100), message="취소됨", clips_created=created)
                 # ✅ 취소된 경우에도 지금까지 만든 것만 저장하고 싶으면 아래 merge 수행
                 break
 
-            text = (seg.text or "").strip()
+            text = (seg_text or "").strip()
             if not text:
                 continue
 
-            start_s = float(seg.start)
-            end_s = float(seg.end)
+            start_s = float(seg_start)
+            end_s = float(seg_end)
             if end_s - start_s < 0.15:
                 continue
 
+            norm, ko_pron, jp_kana = normalize_all(text)
             clip = {
                 "id": str(uuid.uuid4()),
                 "profile_id": profile_id,
@@ -889,9 +1808,9 @@ def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path):
                 "start_s": start_s,
                 "end_s": end_s,
                 "transcript": text,
-                "norm": norm_basic(text),
-                "ko_pron_norm": norm_ko_sound(text),
-                "jp_kana_norm": jp_kana_norm(text),
+                "norm": norm,
+                "ko_pron_norm": ko_pron,
+                "jp_kana_norm": jp_kana,
                 "created_at": now_iso(),
             }
             new_clips.append(clip)
@@ -903,13 +1822,17 @@ def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path):
                 p = min(0.99, max(last_p, 0.02 + created * 0.01))
             last_p = p
 
-            set_job(job_id, progress=int(p * 100), message=f"STT 처리중... (구간 {created}개)", clips_created=created)
+            # 세그먼트마다 갱신하지 않고 %가 바뀌었거나 일정 시간 지났을 때만 반영
+            pct = int(p * 100)
+            now = time.monotonic()
+            if pct != last_pct or now - last_pub >= PROGRESS_MIN_INTERVAL:
+                set_job(job_id, progress=pct, message=f"STT 처리중... (구간 {created}개)", clips_created=created)
+                last_pct = pct
+                last_pub = now
 
         # ✅ 여기서만 data.json에 반영 (락 잡고 merge)
-        with DATA_LOCK:
-            data = load_data()
-            data["clips"].extend(new_clips)
-            save_data(data)
+        with data_transaction() as store:
+            store.add_clips(new_clips)
 
         if cancel_ev.is_set():
             set_job(job_id, status="cancelled", progress=int(last_p * 100), message="취소됨", clips_created=created)
@@ -929,6 +1852,11 @@ def run_stt_job(job_id: str, profile_id: str, audio_id: str, saved_path: Path):
 # - 업로드는 지금 UI처럼 파일별로 요청해도 됨
 # - STT는 EXECUTOR에서 병렬로 돌아가서 "동시에 분석"이 됨
 # =========================
+def copy_upload(src, dst: Path):
+    with open(dst, "wb") as f:
+        shutil.copyfileobj(src, f, UPLOAD_CHUNK_SIZE)
+
+
 @app.post("/api/upload")
 async def api_upload(
     profile_id: str = Form(...),
@@ -941,29 +1869,31 @@ async def api_upload(
     # ...
     audio_id = str(uuid.uuid4())
     saved_path = UPLOAD_DIR / f"{audio_id}{ext}"
-    saved_path.write_bytes(await audio.read())
+    # 통째로 메모리에 올리지 않고 1MiB씩 바로 디스크로 (스레드풀에서 복사해서 이벤트 루프 안 막음)
+    await run_in_threadpool(copy_upload, audio.file, saved_path)
+
+    # 헤더 읽기도 파일 IO라 (ffprobe로 넘어가면 프로세스까지 띄움) 이벤트 루프 밖에서
+    duration = await run_in_threadpool(audio_duration, saved_path)
 
     audio_rec = {
         "id": audio_id,
         "profile_id": profile_id,
         "orig_filename": audio.filename,
         "path": saved_path.name,
-        "duration": ffprobe_duration(saved_path),
+        "duration": duration,
         "created_at": now_iso(),
     }
 
-    with DATA_LOCK:
-        data = load_data()
-        if not any(p["id"] == profile_id for p in data["profiles"]):
+    with data_transaction() as store:
+        if not store.profile(profile_id):
             return JSONResponse({"error": "존재하지 않는 프로필이에요."}, status_code=400)
-        data["audios"].append(audio_rec)
-        save_data(data)
+        store.add_audios([audio_rec])
 
     # job 생성/실행은 그대로
     job_id = str(uuid.uuid4())
     set_job(job_id, status="queued", progress=0, message="대기중...", clips_created=0)
 
-    fut = EXECUTOR.submit(run_stt_job, job_id, profile_id, audio_id, saved_path)
+    fut = EXECUTOR.submit(run_stt_job, job_id, profile_id, audio_id, saved_path, audio_rec["duration"])
     _set_future(job_id, fut)
 
     return {"ok": True, "job_id": job_id, "audio": audio_rec}
@@ -973,16 +1903,69 @@ async def api_upload(
 # =========================
 # Share: Export / Import (프로필 단위)
 # =========================
+# 이미 압축된 오디오 포맷 (zip에 다시 압축하지 않음). wav(PCM)만 DEFLATE 효과가 있음
+_COMPRESSED_AUDIO_EXTS = frozenset({".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".webm"})
+# 가져오기에서 그대로 쓰는 오디오 확장자
+_AUDIO_EXTS = frozenset({".wav", ".mp3", ".m4a", ".flac", ".ogg", ".aac"})
+# zip DEFLATE 레벨: 1이 기본(6)보다 몇 배 빠르고, JSON은 크기 차이도 작음. PCM wav는 어느 레벨이든 비슷하게 줄어듦
+EXPORT_COMPRESSLEVEL = int(os.environ.get("EXPORT_COMPRESSLEVEL", "1"))
+
+
+def _new_export_path() -> Path:
+    # 요청마다 겹치지 않는 임시 zip (보낸 뒤 지움 → exports 폴더에 쌓이지 않음)
+    fd, name = tempfile.mkstemp(dir=EXPORT_DIR, prefix="export_", suffix=".zip")
+    os.close(fd)
+    return Path(name)
+
+
+def _remove_file(path: Path):
+    # 응답 뒤 BackgroundTask에서도 부름: 이미 없거나 Windows에서 아직 열려 있어도(PermissionError) 에러 내지 않음
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _zip_response(zip_path: Path, zip_name: str) -> FileResponse:
+    # 응답을 다 보낸 다음에 임시 zip 삭제
+    return FileResponse(
+        zip_path,
+        media_type="application/zip",
+        filename=zip_name,
+        background=BackgroundTask(_remove_file, zip_path),
+    )
+
+
+def _zip_write_stored(z: zipfile.ZipFile, src: Path, arcname: str):
+    """
+    압축 안 하는 멤버를 파일 통째로 mmap해서 한 번에 씀
+    (z.write는 8KB씩 읽고 CRC 계산하는 루프를 파이썬에서 돎)
+    """
+    zi = zipfile.ZipInfo.from_file(src, arcname)
+    zi.compress_type = zipfile.ZIP_STORED
+    with open(src, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            z.writestr(zi, b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            z.writestr(zi, mm)
+
+
 @app.get("/api/export/profile/{profile_id}")
 def api_export_profile(profile_id: str):
-    data = load_data()
-    prof = next((p for p in data["profiles"] if p.get("id") == profile_id), None)
+    store = get_store()
+    prof = store.profile(profile_id)
     if not prof:
         return JSONResponse({"error": "프로필을 찾을 수 없어요."}, status_code=404)
 
-    clips = [c for c in data["clips"] if c.get("profile_id") == profile_id]
-    audio_ids = set(c.get("audio_id") for c in clips)
-    audios = [a for a in data["audios"] if a.get("id") in audio_ids]
+    clips = store.profile_clips(profile_id)
+    # 클립에 나온 순서대로, id 색인으로 바로 찾음 (전체 audios를 훑지 않음)
+    audios = []
+    for aid in dict.fromkeys(c.get("audio_id") for c in clips):
+        a = store.audio(aid)
+        if a is not None:
+            audios.append(a)
 
     export_data = {
         "profiles": [prof],
@@ -994,10 +1977,25 @@ def api_export_profile(profile_id: str):
 
     safe_name = make_safe_filename(prof.get("name", "profile"), fallback="profile", max_len=40)
     zip_name = f"voice_share_{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-    zip_path = EXPORT_DIR / zip_name
+    zip_path = _new_export_path()
+
+    try:
+        _write_share_zip(zip_path, export_data, audios)
+    except BaseException:
+        _remove_file(zip_path)
+        raise
+
+    return _zip_response(zip_path, zip_name)
 
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        z.writestr("data.json", json.dumps(export_data, ensure_ascii=False, indent=2))
+
+def _write_share_zip(zip_path: Path, export_data: Dict[str, Any], audios: List[Dict[str, Any]]):
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as z:
+        z.writestr(
+            "data.json",
+            orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS),
+            compress_type=zipfile.ZIP_DEFLATED,
+            compresslevel=EXPORT_COMPRESSLEVEL,
+        )
 
         for a in audios:
             rel = a.get("path")
@@ -1005,125 +2003,252 @@ def api_export_profile(profile_id: str):
                 continue
             src = UPLOAD_DIR / rel
             if src.exists():
-                z.write(src, arcname=f"uploads/{rel}")
+                # mp3/m4a 등은 이미 압축돼 있어서 DEFLATE 해봐야 CPU만 쓰고 크기는 그대로 → 그냥 저장
+                if src.suffix.lower() in _COMPRESSED_AUDIO_EXTS:
+                    _zip_write_stored(z, src, f"uploads/{rel}")
+                else:
+                    z.write(src, arcname=f"uploads/{rel}", compress_type=zipfile.ZIP_DEFLATED, compresslevel=EXPORT_COMPRESSLEVEL)
 
-    return FileResponse(zip_path, media_type="application/zip", filename=zip_name)
+
+@app.get("/api/profiles/{profile_id}/export_zip")
+def api_export_profile_clips(profile_id: str):
+    """
+    프로필의 클립들을 잘라낸 wav로 묶어서 zip 하나로 다운로드
+    캐시에 없는 클립은 원본별로 모아서 ffmpeg 한 번에 여러 개씩 잘라냄 (extract_clips_batch)
+    """
+    store = get_store()
+    prof = store.profile(profile_id)
+    if not prof:
+        return JSONResponse({"error": "프로필을 찾을 수 없어요."}, status_code=404)
+
+    clips = store.profile_clips(profile_id)
+
+    todo: Dict[Path, List[Tuple[float, float, Path]]] = defaultdict(list)
+    for c in clips:
+        cache_path = clip_cache_path(c)
+        if cache_path.exists():
+            continue
+        audio = store.audio(c.get("audio_id"))
+        if not audio:
+            continue
+        src = UPLOAD_DIR / audio["path"]
+        if src.exists():
+            todo[src].append((float(c["start_s"]), float(c["end_s"]), cache_path))
+
+    for src, cuts in todo.items():
+        try:
+            extract_clips_batch(src, cuts)
+        except (OSError, subprocess.CalledProcessError):
+            pass  # 못 자른 원본의 클립은 zip에서 빠짐
+
+    safe_name = make_safe_filename(prof.get("name", "profile"), fallback="profile", max_len=40)
+    zip_name = f"voice_clips_{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    zip_path = _new_export_path()
+
+    try:
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=EXPORT_COMPRESSLEVEL) as z:
+            for c in clips:
+                cache_path = clip_cache_path(c)
+                if cache_path.exists():
+                    z.write(cache_path, arcname=store.download_name(c))
+    except BaseException:
+        _remove_file(zip_path)
+        raise
+
+    return _zip_response(zip_path, zip_name)
+
+
+IMPORT_COPY_WORKERS = min(8, (os.cpu_count() or 4) * 2)
+# zip 폭탄 방지: 압축 풀었을 때 크기(ZipInfo.file_size) 기준 상한
+IMPORT_MAX_DATA_JSON_BYTES = int(os.environ.get("IMPORT_MAX_DATA_JSON_MB", "256")) * 1024 * 1024
+IMPORT_MAX_TOTAL_BYTES = int(os.environ.get("IMPORT_MAX_TOTAL_MB", "2048")) * 1024 * 1024
+
+
+def _extract_member(z: zipfile.ZipFile, member: str, dst: Path):
+    # 압축 풀면서 바로 최종 위치로 (임시 폴더에 풀었다가 다시 복사하지 않음)
+    # 깨진 zip(CRC 오류)/디스크 부족 등으로 실패하면 반쯤 쓴 파일은 지우고 에러를 그대로 올림
+    try:
+        with z.open(member) as src, open(dst, "wb") as out:
+            shutil.copyfileobj(src, out, UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        _remove_file(dst)
+        raise
+
+
+def _bulk_uuid4(n: int) -> Iterator[str]:
+    # uuid4 n개를 os.urandom 한 번으로 (레코드마다 urandom 부르지 않음). 형식은 str(uuid4())와 같음
+    rand = os.urandom(16 * n)
+    for i in range(0, 16 * n, 16):
+        yield str(uuid.UUID(bytes=rand[i:i + 16], version=4))
+
+
+def _find_zip_data_json(names: List[str]) -> Optional[str]:
+    # data.json을 루트에 고정하지 말고, 어디 있든 찾기 (가장 짧은 경로 = 가장 상위를 우선)
+    # zip 목록(central directory)만 한 번 훑음. 루트에 있으면 바로 끝
+    best: Optional[str] = None
+    best_depth = 0
+    for n in names:
+        if n == "data.json":
+            return n
+        if n.endswith("/data.json"):
+            depth = n.count("/")
+            if best is None or depth < best_depth:
+                best, best_depth = n, depth
+    return best
 
 
 @app.post("/api/import")
 async def api_import(file: UploadFile = File(...)):
-    tmp_id = str(uuid.uuid4())
-    tmp_dir = IMPORT_DIR / tmp_id
-    tmp_dir.mkdir(parents=True, exist_ok=True)
+    # 업로드된 파일(SpooledTemporaryFile, 크면 이미 디스크에 있음)을 zip으로 바로 열어서 읽음
+    # → imports_tmp에 import.zip으로 한 번 더 복사하지 않음. zip 읽기/오디오 복사는 스레드풀에서
+    return await run_in_threadpool(_import_upload, file.file)
 
-    zip_path = tmp_dir / "import.zip"
-    zip_path.write_bytes(await file.read())
 
+def _import_upload(fobj):
+    # extractall 하지 않고 zip에서 필요한 것(data.json + 가져올 오디오)만 바로 읽음
     try:
-        with zipfile.ZipFile(zip_path, "r") as z:
-            z.extractall(tmp_dir)
+        z = zipfile.ZipFile(fobj, "r")
+        names = z.namelist()
     except Exception as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
         return JSONResponse({"error": f"zip 해제 실패: {e}"}, status_code=400)
 
-    # ✅ data.json을 루트에 고정하지 말고, 어디 있든 찾기
-    candidates = list(tmp_dir.rglob("data.json"))
-    if not candidates:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+    with z:
+        return _import_from_zip(z, names)
+
+
+def _import_from_zip(z: zipfile.ZipFile, names: List[str]):
+    data_name = _find_zip_data_json(names)
+    if not data_name:
         return JSONResponse({"error": "zip 안에서 data.json을 찾지 못했어요. (폴더 구조 확인 필요)"}, status_code=400)
 
-    # 가장 짧은 경로(가장 상위)를 우선
-    candidates.sort(key=lambda p: len(p.parts))
-    data_file = candidates[0]
+    if z.getinfo(data_name).file_size > IMPORT_MAX_DATA_JSON_BYTES:
+        return JSONResponse({"error": "data.json이 너무 커요."}, status_code=400)
 
     try:
-        imported = json.loads(data_file.read_text(encoding="utf-8"))
+        imported = orjson.loads(z.read(data_name))
         imported_profiles = imported.get("profiles") or []
         imported_audios = imported.get("audios") or []
         imported_clips = imported.get("clips") or []
     except Exception as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
         return JSONResponse({"error": f"data.json 파싱 실패: {e}"}, status_code=400)
 
     if not imported_profiles:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
         return JSONResponse({"error": "가져올 프로필이 없어요."}, status_code=400)
 
+    # 가져오기 한 번에 만든 레코드는 모두 같은 시각으로
+    created = now_iso()
+
+    new_ids = _bulk_uuid4(1 + len(imported_audios) + len(imported_clips))
+
     old_profile = imported_profiles[0]
-    new_profile_id = str(uuid.uuid4())
-    new_profile = dict(old_profile)
-    new_profile["id"] = new_profile_id
-    new_profile["name"] = f"{new_profile.get('name','profile')} (import)"
-    new_profile["created_at"] = now_iso()
+    new_profile_id = next(new_ids)
+    new_profile = {
+        **old_profile,
+        "id": new_profile_id,
+        "name": f"{old_profile.get('name','profile')} (import)",
+        "created_at": created,
+    }
 
     audio_id_map: Dict[str, str] = {}
+    new_paths: Dict[str, str] = {}  # old audio id -> 새 uploads 파일명
     new_audios = []
 
     for a in imported_audios:
         old_aid = a.get("id")
         if not old_aid:
             continue
-        new_aid = str(uuid.uuid4())
+        new_aid = next(new_ids)
         audio_id_map[old_aid] = new_aid
 
-        na = dict(a)
-        na["id"] = new_aid
-        na["profile_id"] = new_profile_id
-        na["created_at"] = now_iso()
-
         old_path = (a.get("path") or "")
-        ext = Path(old_path).suffix.lower()
-        if ext not in [".wav", ".mp3", ".m4a", ".flac", ".ogg", ".aac"]:
+        ext = os.path.splitext(old_path)[1].lower()
+        if ext not in _AUDIO_EXTS:
             ext = ext or ".wav"
-        na["path"] = f"{new_aid}{ext}"
-        new_audios.append(na)
+        new_paths[old_aid] = f"{new_aid}{ext}"
+
+        # 복사 후 하나씩 덮어쓰지 않고 한 번에 만들기
+        new_audios.append({
+            **a,
+            "id": new_aid,
+            "profile_id": new_profile_id,
+            "created_at": created,
+            "path": new_paths[old_aid],
+        })
+
+    # ✅ uploads 폴더도 data.json이 있던 위치 기준으로 찾기 (없으면 루트의 uploads/)
+    base = data_name[: -len("data.json")]
+    uploads_prefix = f"{base}uploads/"
+    if not any(n.startswith(uploads_prefix) for n in names):
+        uploads_prefix = "uploads/"
+    members = set(names)
+
+    copies: List[Tuple[str, Path]] = []
+    missing_aids = set()
+    total = 0
+    for a in imported_audios:
+        old_aid = a.get("id")
+        if old_aid not in audio_id_map:
+            continue
+        src_rel = a.get("path")
+        member = uploads_prefix + src_rel if src_rel else None
+        if member not in members:
+            # zip에 파일이 없는 오디오는 가져오지 않음 (파일 없는 레코드/클립이 생기지 않게)
+            del audio_id_map[old_aid]
+            missing_aids.add(old_aid)
+            continue
+        # 쓰기 전에 목록만 보고 합계 확인 (중간까지 풀었다가 실패하지 않게)
+        total += z.getinfo(member).file_size
+        if total > IMPORT_MAX_TOTAL_BYTES:
+            return JSONResponse({"error": "가져올 오디오 용량이 너무 커요."}, status_code=400)
 
+        # 레코드의 path와 같은 이름으로 (확장자 대소문자까지 맞춰야 나중에 파일을 찾음)
+        copies.append((member, UPLOAD_DIR / new_paths[old_aid]))
+
+    kept = set(audio_id_map.values())
+    before = len(new_audios)
+    new_audios = [a for a in new_audios if a["id"] in kept]
+    skipped = before - len(new_audios)
+
+    # 건너뛴 오디오에 달린 클립도 같이 건너뜀 (가리킬 파일이 없으니까). 개수는 응답에 따로 알려줌
     new_clips = []
+    skipped_clips = 0
     for c in imported_clips:
         old_aid = c.get("audio_id")
         if old_aid not in audio_id_map:
+            if old_aid in missing_aids:
+                skipped_clips += 1
             continue
-        nc = dict(c)
-        nc["id"] = str(uuid.uuid4())
-        nc["profile_id"] = new_profile_id
-        nc["audio_id"] = audio_id_map[old_aid]
-        nc["created_at"] = now_iso()
-        new_clips.append(nc)
-
-    # ✅ uploads 폴더도 data.json이 있던 위치 기준으로 찾기
-    base_dir = data_file.parent
-    uploads_in_zip = base_dir / "uploads"
-    if not uploads_in_zip.exists():
-        # 혹시 루트에 있는 경우도 커버
-        alt = tmp_dir / "uploads"
-        if alt.exists():
-            uploads_in_zip = alt
-
-    if uploads_in_zip.exists():
-        for a in imported_audios:
-            old_aid = a.get("id")
-            if old_aid not in audio_id_map:
-                continue
-            src_rel = a.get("path")
-            if not src_rel:
-                continue
-            src = uploads_in_zip / src_rel
-            if not src.exists():
-                continue
-
-            new_aid = audio_id_map[old_aid]
-            ext = Path(src_rel).suffix
-            dst = UPLOAD_DIR / f"{new_aid}{ext}"
-            try:
-                shutil.copy2(src, dst)
-            except Exception:
-                pass
-
-    data = load_data()
-    data["profiles"].append(new_profile)
-    data["audios"].extend(new_audios)
-    data["clips"].extend(new_clips)
-    save_data(data)
-
-    shutil.rmtree(tmp_dir, ignore_errors=True)
-    return {"ok": True, "imported_profile": new_profile, "clips": len(new_clips), "audios": len(new_audios)}
+        new_clips.append({
+            **c,
+            "id": next(new_ids),
+            "profile_id": new_profile_id,
+            "audio_id": audio_id_map[old_aid],
+            "created_at": created,
+        })
+
+    # 파일마다 압축 풀기/쓰기가 따로라서 여러 개를 동시에 (디스크 IO가 겹치게)
+    if copies:
+        workers = min(IMPORT_COPY_WORKERS, len(copies))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                list(ex.map(lambda md: _extract_member(z, *md), copies))
+        except Exception as e:
+            # 하나라도 실패하면 가져오기 전체를 취소 (이미 푼 파일도 지움)
+            for _, dst in copies:
+                _remove_file(dst)
+            return JSONResponse({"error": f"오디오 파일 복사 실패: {e}"}, status_code=400)
+
+    # 세 번 추가하는 동안 다른 요청이 끼어들지 않게 한 트랜잭션으로 (저장도 한 번)
+    with data_transaction() as store:
+        store.add_profile(new_profile)
+        store.add_audios(new_audios)
+        store.add_clips(new_clips)
+
+    return {
+        "ok": True,
+        "imported_profile": new_profile,
+        "clips": len(new_clips),
+        "audios": len(new_audios),
+        "skipped_audios": skipped,
+        "skipped_clips": skipped_clips,
+    }
@@ -552,7 +552,10 @@ importZip.addEventListener("change", async (ev) => {
     }
 
     await doSearch();
-    alert(`가져오기 완료! (클립 ${res.clips ?? 0}개 / 오디오 ${res.audios ?? 0}개)`);
+    const skippedMsg = res.skipped_audios
+      ? `\n(zip에 파일이 없어 건너뛴 오디오 ${res.skipped_audios}개 / 클립 ${res.skipped_clips ?? 0}개)`
+      : "";
+    alert(`가져오기 완료! (클립 ${res.clips ?? 0}개 / 오디오 ${res.audios ?? 0}개)${skippedMsg}`);
   } catch (e) {
     alert(e.message);
   } finally {